@@ -9,6 +9,9 @@ const openai = new OpenAI({
   apiKey: process.env.OPENAI_API_KEY,
 });
 
+// Dot-directories such as .git are already skipped by the hidden-entry check
+const IGNORED_DIRECTORIES = new Set(['node_modules', 'dist', 'build', 'coverage']);
+
 interface ProjectAnalysis {
   projectType: string;
   framework: string;
@@ -169,38 +172,40 @@ Respond with only the JSON object, no additional text.
   }
 }
 
-async function getProjectStructure(projectPath: string, maxDepth: number = 2, currentDepth: number = 0): Promise<string> {
+async function getProjectStructure(projectPath: string, maxDepth: number = 2): Promise<string> {
+  const lines: string[] = [];
+  await collectProjectStructure(projectPath, maxDepth, 0, lines);
+  return lines.join('');
+}
+
+async function collectProjectStructure(projectPath: string, maxDepth: number, currentDepth: number, lines: string[]): Promise<void> {
   try {
     if (currentDepth > maxDepth) {
-      return '';
+      return;
     }
 
-    const items = await fs.readdir(projectPath, { withFileTypes: true });
-    let structure = '';
+    // Skip hidden entries and prune ignored directories before recursing, then sort
+    // once so directories come first in name order and the output is stable
+    const items = (await fs.readdir(projectPath, { withFileTypes: true }))
+      .filter(item => item.name[0] !== '.' &&
+        !(item.isDirectory() && IGNORED_DIRECTORIES.has(item.name)))
+      .sort((a, b) => Number(b.isDirectory()) - Number(a.isDirectory()) ||
+        (a.name < b.name ? -1 : a.name > b.name ? 1 : 0));
+    const indent = '  '.repeat(currentDepth);
 
     for (const item of items) {
-      // Skip common ignored directories and files
-      if (item.name.startsWith('.') || 
-          ['node_modules', 'dist', 'build', '.git', 'coverage'].includes(item.name)) {
-        continue;
-      }
-
-      const indent = '  '.repeat(currentDepth);
-      
       if (item.isDirectory()) {
-        structure += `${indent}${item.name}/\n`;
+        lines.push(`${indent}${item.name}/\n`);
         // Recursively get subdirectory structure
         const subPath = path.join(projectPath, item.name);
-        structure += await getProjectStructure(subPath, maxDepth, currentDepth + 1);
+        await collectProjectStructure(subPath, maxDepth, currentDepth + 1, lines);
       } else {
-        structure += `${indent}${item.name}\n`;
+        lines.push(`${indent}${item.name}\n`);
       }
     }
-
-    return structure;
   } catch (error) {
     console.error('Error reading project structure:', error);
-    return 'Error reading project structure';
+    lines.push('Error reading project structure');
   }
 }
 
@@ -218,7 +223,7 @@ async function getPackageJsonContent(projectPath: string): Promise<string> {
       devDependencies: packageData.devDependencies
     };
     
-    return JSON.stringify(relevantData, null, 2);
+    return JSON.stringify(relevantData);
   } catch (error) {
     // Try to find package.json in subdirectories (frontend/backend)
     try {
@@ -69,6 +69,15 @@ export async function POST(request: NextRequest) {
       }, { status: 500 });
     }
 
+    // Summary of the project returned with every chat response
+    const projectInfo = {
+      name: projectContext.projectName,
+      path: projectContext.projectPath,
+      filesCount: projectContext.files.length,
+      hasPackageJson: !!projectContext.packageJson,
+      hasReadme: !!projectContext.readme
+    };
+
     // Check if user is requesting code modifications
     const isCodeModification = OpenAIAgentService.isCodeModificationRequest(message);
     
@@ -88,13 +97,7 @@ export async function POST(request: NextRequest) {
           return NextResponse.json({
             success: true,
             response: `✅ **Code modifications completed!**\n\n${modificationResult.changes}\n\n📝 **Files modified:** ${modificationResult.filesModified.length}\n${modificationResult.filesModified.map(f => `• ${f.split('/').pop()}`).join('\n')}\n\n🔄 The project will be automatically restarted to apply your changes.`,
-            projectInfo: {
-              name: projectContext.projectName,
-              path: projectContext.projectPath,
-              filesCount: projectContext.files.length,
-              hasPackageJson: !!projectContext.packageJson,
-              hasReadme: !!projectContext.readme
-            },
+            projectInfo,
             isCodeModification: true,
             modificationResult
           });
@@ -103,13 +106,7 @@ export async function POST(request: NextRequest) {
           return NextResponse.json({
             success: false,
             response: `❌ **Failed to apply code modifications**\n\nError: ${modificationResult.error}\n\nPlease try rephrasing your request or be more specific about what you'd like to change.`,
-            projectInfo: {
-              name: projectContext.projectName,
-              path: projectContext.projectPath,
-              filesCount: projectContext.files.length,
-              hasPackageJson: !!projectContext.packageJson,
-              hasReadme: !!projectContext.readme
-            },
+            projectInfo,
             isCodeModification: true,
             error: modificationResult.error
           });
@@ -156,13 +153,7 @@ export async function POST(request: NextRequest) {
       return NextResponse.json({
         success: true,
         response: aiResponse,
-        projectInfo: {
-          name: projectContext.projectName,
-          path: projectContext.projectPath,
-          filesCount: projectContext.files.length,
-          hasPackageJson: !!projectContext.packageJson,
-          hasReadme: !!projectContext.readme
-        }
+        projectInfo
       });
     } catch (error) {
       console.error('Error generating AI response:', error);
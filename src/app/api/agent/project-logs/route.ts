@@ -2,6 +2,7 @@ import { NextRequest, NextResponse } from 'next/server';
 import { auth } from '@/auth';
 import { GCPVmService } from '@/lib/gcpVmService';
 import prisma from '@/lib/prisma';
+import { userService } from '@/lib/userService';
 
 export async function POST(request: NextRequest) {
   try {
@@ -39,7 +40,6 @@ export async function POST(request: NextRequest) {
     // Get gitea username for proper project path resolution
     let giteaUsername: string | undefined;
     try {
-      const { userService } = await import('@/lib/userService');
       const giteaIntegration = await userService.ensureGiteaIntegration(session.user.id!);
       giteaUsername = giteaIntegration.giteaUser?.login;
     } catch (error) {
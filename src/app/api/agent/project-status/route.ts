@@ -2,6 +2,8 @@ import { NextRequest, NextResponse } from 'next/server';
 import { auth } from '@/auth';
 import { GCPVmService } from '@/lib/gcpVmService';
 import prisma from '@/lib/prisma';
+import { userService } from '@/lib/userService';
+import { clearProjectVmIP } from '@/utils/proxyHelpers';
 
 export async function POST(request: NextRequest) {
   try {
@@ -39,7 +41,6 @@ export async function POST(request: NextRequest) {
     // Get gitea username for proper project path resolution
     let giteaUsername: string | undefined;
     try {
-      const { userService } = await import('@/lib/userService');
       const giteaIntegration = await userService.ensureGiteaIntegration(session.user.id!);
       giteaUsername = giteaIntegration.giteaUser?.login;
     } catch (error) {
@@ -108,7 +109,6 @@ export async function DELETE(request: NextRequest) {
     // Get gitea username for proper project path resolution
     let giteaUsername: string | undefined;
     try {
-      const { userService } = await import('@/lib/userService');
       const giteaIntegration = await userService.ensureGiteaIntegration(session.user.id!);
       giteaUsername = giteaIntegration.giteaUser?.login;
     } catch (error) {
@@ -121,6 +121,8 @@ export async function DELETE(request: NextRequest) {
       repository.giteaRepoName || repository.repoName,
       giteaUsername
     );
+    // The proxy must not keep forwarding to a port that may be handed to another project
+    clearProjectVmIP(session.user.id ?? '', repositoryId);
 
     return NextResponse.json({
       success: stopped,
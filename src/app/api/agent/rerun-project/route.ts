@@ -4,9 +4,13 @@ import prisma from '@/lib/prisma';
 import { AgentService } from '@/lib/agentService';
 import { GCPVmService } from '@/lib/gcpVmService';
 import { userService } from '@/lib/userService';
+import { clearProjectVmIP } from '@/utils/proxyHelpers';
 import path from 'path';
 import fs from 'fs/promises';
 
+// Any of these at the top level marks a directory as a runnable project
+const PROJECT_MARKER_FILES = new Set(['package.json', 'requirements.txt', 'src', 'app.py', 'main.py']);
+
 interface RerunProjectResult {
   success: boolean;
   message?: string;
@@ -74,6 +78,8 @@ export async function POST(request: NextRequest) {
         repository.giteaRepoName || repository.repoName,
         giteaUsername
       );
+      // A rerun may pick a different port
+      clearProjectVmIP(session.user.id, repositoryId);
 
       if (vmResult.success) {
         result = {
@@ -139,71 +145,57 @@ async function findExistingProjectPath(repoName: string): Promise<string | null>
   try {
     const tempDir = path.join(process.cwd(), 'temp', 'cloned-repos');
     
-    // Check if temp directory exists
+    // Read all directories in temp/cloned-repos; a missing directory fails here
+    let entries;
     try {
-      await fs.access(tempDir);
+      entries = await fs.readdir(tempDir, { withFileTypes: true });
     } catch {
       console.log('Temp directory does not exist');
       return null;
     }
 
-    // Read all directories in temp/cloned-repos
-    const entries = await fs.readdir(tempDir, { withFileTypes: true });
-    
-    // Filter for directories that match the repo name pattern
-    const matchingDirs = entries
-      .filter(entry => 
-        entry.isDirectory() && 
-        entry.name.includes(repoName) && 
-        (entry.name.includes('-gitea-') || entry.name.includes('-github-'))
-      )
-      .map(entry => ({
-        name: entry.name,
-        path: path.join(tempDir, entry.name)
-      }));
-
-    if (matchingDirs.length === 0) {
+    // Keep only the most recent directory matching the repo name pattern,
+    // using the timestamp suffix (e.g., "repo-name-gitea-1234567890")
+    let mostRecentPath: string | null = null;
+    let mostRecentTimestamp = -1;
+
+    for (const entry of entries) {
+      if (!entry.isDirectory() ||
+          !entry.name.includes(repoName) ||
+          !(entry.name.includes('-gitea-') || entry.name.includes('-github-'))) {
+        continue;
+      }
+
+      const timestampMatch = entry.name.match(/-(\d+)$/);
+      const timestamp = timestampMatch ? parseInt(timestampMatch[1]) : 0;
+      if (timestamp > mostRecentTimestamp) {
+        mostRecentTimestamp = timestamp;
+        mostRecentPath = path.join(tempDir, entry.name);
+      }
+    }
+
+    if (!mostRecentPath) {
       console.log(`No existing project directories found for ${repoName}`);
       return null;
     }
-
-    // Get timestamps from directory names and sort by most recent
-    const sortedDirs = matchingDirs
-      .map(dir => {
-        // Extract timestamp from directory name (e.g., "repo-name-gitea-1234567890")
-        const timestampMatch = dir.name.match(/-(\d+)$/);
-        const timestamp = timestampMatch ? parseInt(timestampMatch[1]) : 0;
-        return { ...dir, timestamp };
-      })
-      .sort((a, b) => b.timestamp - a.timestamp);
-
-    const mostRecentPath = sortedDirs[0].path;
     
     // Verify the directory still exists and contains project files
+    let files: string[];
     try {
-      await fs.access(mostRecentPath);
-      const files = await fs.readdir(mostRecentPath);
-      
-      // Check if it looks like a valid project directory
-      const hasProjectFiles = files.some(file => 
-        file === 'package.json' || 
-        file === 'requirements.txt' || 
-        file === 'src' || 
-        file === 'app.py' || 
-        file === 'main.py'
-      );
-
-      if (hasProjectFiles) {
-        console.log(`✅ Found existing project at: ${mostRecentPath}`);
-        return mostRecentPath;
-      } else {
-        console.log(`Directory exists but doesn't contain valid project files: ${mostRecentPath}`);
-        return null;
-      }
+      files = await fs.readdir(mostRecentPath);
     } catch {
       console.log(`Directory no longer exists: ${mostRecentPath}`);
       return null;
     }
+
+    // Check if it looks like a valid project directory
+    if (files.some(file => PROJECT_MARKER_FILES.has(file))) {
+      console.log(`✅ Found existing project at: ${mostRecentPath}`);
+      return mostRecentPath;
+    }
+
+    console.log(`Directory exists but doesn't contain valid project files: ${mostRecentPath}`);
+    return null;
   } catch (error) {
     console.error('Error finding existing project path:', error);
     return null;
@@ -4,6 +4,8 @@ import { GCPVmService } from '@/lib/gcpVmService';
 import { VMProjectResult } from '@/types/gcp';
 import { auth } from '@/auth';
 import prisma from '@/lib/prisma';
+import { userService } from '@/lib/userService';
+import { clearProjectVmIP } from '@/utils/proxyHelpers';
 
 // GET: Check port availability (legacy support)
 export async function GET() {
@@ -71,7 +73,6 @@ export async function POST(request: NextRequest) {
       // Get gitea username for better project organization on VM
       let giteaUsername: string | undefined;
       try {
-        const { userService } = await import('@/lib/userService');
         const giteaIntegration = await userService.ensureGiteaIntegration(session.user.id!);
         giteaUsername = giteaIntegration.giteaUser?.login;
       } catch (error) {
@@ -81,11 +82,10 @@ export async function POST(request: NextRequest) {
 
       // Run project on GCP VM or locally
       if (useGCPVM) {
-        // Create a callback for real-time logging
+        // Collect log messages for the response (GCPVmService already echoes them to the console)
         const logMessages: string[] = [];
         const logCallback = (message: string) => {
           logMessages.push(message);
-          console.log(`[GCP VM] ${message}`);
         };
 
         const gcpVmService = new GCPVmService(logCallback);
@@ -109,6 +109,8 @@ export async function POST(request: NextRequest) {
           localClonePath,
           giteaUsername
         );
+        // A new deployment may pick a different port
+        clearProjectVmIP(session.user.id ?? '', repositoryId);
         
         // Add logs to the result
         (result as VMProjectResult).logs = logMessages.join('\n');
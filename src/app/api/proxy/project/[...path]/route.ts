@@ -1,5 +1,6 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { auth } from '@/auth';
+import { resolveProjectVmIP } from '@/utils/proxyHelpers';
 
 export async function GET(
      request: NextRequest,
@@ -19,31 +20,16 @@ export async function GET(
                return NextResponse.json({ error: 'Repository ID is required' }, { status: 400 });
           }
 
-          // Get the project status to retrieve the VM IP
-          const baseUrl = process.env.NEXTAUTH_URL || `${request.nextUrl.protocol}//${request.nextUrl.host}`;
-          const statusResponse = await fetch(`${baseUrl}/api/agent/project-status`, {
-               method: 'POST',
-               headers: {
-                    'Content-Type': 'application/json',
-                    'Cookie': request.headers.get('cookie') || '', // Forward cookies for auth
-               },
-               body: JSON.stringify({ repositoryId }),
-          });
-
-          if (!statusResponse.ok) {
-               return NextResponse.json({ error: 'Failed to get project status' }, { status: 500 });
-          }
-
-          const statusData = await statusResponse.json();
-
-          if (!statusData.isRunning || !statusData.vmIP) {
-               return NextResponse.json({ error: 'Project is not running or VM IP not available' }, { status: 404 });
+          const vmIPResult = await resolveProjectVmIP(request, session.user?.id ?? '', repositoryId);
+          if (!vmIPResult.ok) {
+               return NextResponse.json({ error: vmIPResult.error }, { status: vmIPResult.status });
           }
+          const { vmIP } = vmIPResult;
 
           // Build the target URL
           const pathString = params.path ? `/${params.path.join('/')}` : '/';
           const search = request.nextUrl.search || '';
-          const targetUrl = `http://${statusData.vmIP}:${port}${pathString}${search}`;
+          const targetUrl = `http://${vmIP}:${port}${pathString}${search}`;
 
           console.log(`Proxying request to: ${targetUrl}`);
 
@@ -51,7 +37,7 @@ export async function GET(
                method: request.method,
                headers: {
                     ...Object.fromEntries(request.headers.entries()),
-                    'host': `${statusData.vmIP}:${port}`,
+                    'host': `${vmIP}:${port}`,
                },
                body: request.method !== 'GET' ? await request.arrayBuffer() : undefined,
           });
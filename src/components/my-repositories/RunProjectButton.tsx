@@ -225,6 +225,9 @@ export const RunProjectButton: React.FC<RunProjectButtonProps> = ({
     disabled:cursor-not-allowed disabled:transform-none
   `;
 
+  // Format the log timestamp once per render rather than once per log line
+  const logTimestamp = new Date().toLocaleTimeString();
+
   return (
     <div className="space-y-3">
       {/* GCP VM Toggle */}
@@ -507,7 +510,7 @@ export const RunProjectButton: React.FC<RunProjectButtonProps> = ({
                   {deploymentLogs.map((log, index) => (
                     <div key={index} className="mb-1">
                       <span className="text-gray-500">
-                        [{new Date().toLocaleTimeString()}]
+                        [{logTimestamp}]
                       </span>
                       <span className="ml-2">{log}</span>
                     </div>
@@ -46,6 +46,14 @@ export interface ProjectRunResult {
 
 export class AgentService {
   private static readonly TEMP_CLONE_DIR = path.join(process.cwd(), 'temp', 'cloned-repos');
+  // Dot-directories such as .git are already skipped by the hidden-entry check
+  private static readonly IGNORED_DIRECTORIES = new Set(['node_modules', 'dist', 'build', 'coverage']);
+  // Contractions escaped by fixEslintUnescapedEntities (doesn't, can't, won't, ...)
+  private static readonly UNESCAPED_CONTRACTION_PATTERN = /(does|ca|wo|do|is|are|was|were|has|have|should|would|could)n't/g;
+  private static readonly TS_SOURCE_EXTENSIONS = new Set(['.ts', '.tsx']);
+  private static readonly MAX_CACHED_ANALYSIS_INPUTS = 16;
+  // Prompt inputs per project path, in least-recently-used order
+  private static analysisInputCache = new Map<string, { mtimeKey: string; projectStructure: string; packageJsonContent: string }>();
 
   /**
    * Check for available ports on GCP
@@ -126,8 +134,7 @@ export class AgentService {
   static async analyzeProjectWithAI(projectPath: string): Promise<ProjectAnalysis | null> {
     try {
       // Read project structure and key files
-      const projectStructure = await this.getProjectStructure(projectPath);
-      const packageJsonContent = await this.getPackageJsonContent(projectPath);
+      const { projectStructure, packageJsonContent } = await this.getAnalysisInputs(projectPath);
       
       const prompt = `
 Analyze this project structure and provide build/run commands for Ubuntu Linux VM deployment:
@@ -207,41 +214,96 @@ Respond with only the JSON object, no additional text.
     }
   }
 
+  /**
+   * Get the project structure and package.json summary, reusing the previous
+   * result while these mtimes are unchanged: the project root, its top-level
+   * directories, and every package.json getPackageJsonContent may read (root,
+   * frontend/ and backend/). Entries added or removed inside second-level
+   * directories, and edits to any other file, are not detected.
+   */
+  private static async getAnalysisInputs(projectPath: string): Promise<{ projectStructure: string; packageJsonContent: string }> {
+    const [rootStat, packageStat, frontendPackageStat, backendPackageStat, rootEntries] = await Promise.all([
+      fs.stat(projectPath).catch(() => null),
+      fs.stat(path.join(projectPath, 'package.json')).catch(() => null),
+      // Editing a file in place changes no directory mtime, so the fallback
+      // package.json files are stat'ed directly
+      fs.stat(path.join(projectPath, 'frontend', 'package.json')).catch(() => null),
+      fs.stat(path.join(projectPath, 'backend', 'package.json')).catch(() => null),
+      fs.readdir(projectPath, { withFileTypes: true }).catch(() => [])
+    ]);
+    // Adding a file under src/ only changes the mtime of src/, not of the root
+    const directoryStats = await Promise.all(
+      rootEntries
+        .filter(entry => entry.isDirectory() && entry.name[0] !== '.' && !this.IGNORED_DIRECTORIES.has(entry.name))
+        .map(entry => fs.stat(path.join(projectPath, entry.name)).catch(() => null))
+    );
+    const mtimeKey = [rootStat, packageStat, frontendPackageStat, backendPackageStat, ...directoryStats]
+      .map(stat => stat?.mtimeMs ?? 0)
+      .join(':');
+
+    const cached = this.analysisInputCache.get(projectPath);
+    if (cached && cached.mtimeKey === mtimeKey) {
+      // Refresh recency so the entry survives eviction
+      this.analysisInputCache.delete(projectPath);
+      this.analysisInputCache.set(projectPath, cached);
+      return cached;
+    }
+
+    const [projectStructure, packageJsonContent] = await Promise.all([
+      this.getProjectStructure(projectPath),
+      this.getPackageJsonContent(projectPath)
+    ]);
+
+    const entry = { mtimeKey, projectStructure, packageJsonContent };
+    this.analysisInputCache.delete(projectPath);
+    this.analysisInputCache.set(projectPath, entry);
+    if (this.analysisInputCache.size > this.MAX_CACHED_ANALYSIS_INPUTS) {
+      this.analysisInputCache.delete(this.analysisInputCache.keys().next().value!);
+    }
+
+    return entry;
+  }
+
   /**
    * Get project structure for AI analysis
    */
-  private static async getProjectStructure(projectPath: string, maxDepth: number = 2, currentDepth: number = 0): Promise<string> {
+  private static async getProjectStructure(projectPath: string, maxDepth: number = 2): Promise<string> {
+    const lines: string[] = [];
+    await this.collectProjectStructure(projectPath, maxDepth, 0, lines);
+    return lines.join('');
+  }
+
+  /**
+   * Append one line per entry to lines, recursing into subdirectories up to maxDepth
+   */
+  private static async collectProjectStructure(projectPath: string, maxDepth: number, currentDepth: number, lines: string[]): Promise<void> {
     try {
       if (currentDepth > maxDepth) {
-        return '';
+        return;
       }
 
-      const items = await fs.readdir(projectPath, { withFileTypes: true });
-      let structure = '';
+      // Skip hidden entries and prune ignored directories before recursing, then sort
+      // once so directories come first in name order and the output is stable
+      const items = (await fs.readdir(projectPath, { withFileTypes: true }))
+        .filter(item => item.name[0] !== '.' &&
+          !(item.isDirectory() && this.IGNORED_DIRECTORIES.has(item.name)))
+        .sort((a, b) => Number(b.isDirectory()) - Number(a.isDirectory()) ||
+          (a.name < b.name ? -1 : a.name > b.name ? 1 : 0));
+      const indent = '  '.repeat(currentDepth);
 
       for (const item of items) {
-        // Skip common ignored directories and files
-        if (item.name.startsWith('.') || 
-            ['node_modules', 'dist', 'build', '.git', 'coverage'].includes(item.name)) {
-          continue;
-        }
-
-        const indent = '  '.repeat(currentDepth);
-        
         if (item.isDirectory()) {
-          structure += `${indent}${item.name}/\n`;
+          lines.push(`${indent}${item.name}/\n`);
           // Recursively get subdirectory structure
           const subPath = path.join(projectPath, item.name);
-          structure += await this.getProjectStructure(subPath, maxDepth, currentDepth + 1);
+          await this.collectProjectStructure(subPath, maxDepth, currentDepth + 1, lines);
         } else {
-          structure += `${indent}${item.name}\n`;
+          lines.push(`${indent}${item.name}\n`);
         }
       }
-
-      return structure;
     } catch (error) {
       console.error('Error reading project structure:', error);
-      return 'Error reading project structure';
+      lines.push('Error reading project structure');
     }
   }
 
@@ -262,7 +324,7 @@ Respond with only the JSON object, no additional text.
         devDependencies: packageData.devDependencies
       };
       
-      return JSON.stringify(relevantData, null, 2);
+      return JSON.stringify(relevantData);
     } catch (error) {
       // Try to find package.json in subdirectories (frontend/backend)
       try {
@@ -298,9 +360,7 @@ Respond with only the JSON object, no additional text.
       const hasBackendFolder = await this.directoryExists(path.join(projectPath, 'backend'));
       const hasFrontendFolder = await this.directoryExists(path.join(projectPath, 'frontend'));
 
-      if ((analysis.projectType.toLowerCase().includes('fullstack') || 
-           analysis.projectType.toLowerCase().includes('full-stack')) && 
-          hasBackendFolder && hasFrontendFolder) {
+      if (/full-?stack/i.test(analysis.projectType) && hasBackendFolder && hasFrontendFolder) {
         // Handle true fullstack projects with separate folders
         scriptContent = `
 @echo off
@@ -405,35 +465,18 @@ ECHO Application will be available at: http://localhost:${port}
       const files = await this.findTsxFiles(projectPath);
       
       for (const file of files) {
-        let content = await fs.readFile(file, 'utf-8');
-        let modified = false;
-
-        // Fix common unescaped entities
-        const fixes = [
-          { from: /doesn't/g, to: "doesn&apos;t" },
-          { from: /can't/g, to: "can&apos;t" },
-          { from: /won't/g, to: "won&apos;t" },
-          { from: /don't/g, to: "don&apos;t" },
-          { from: /isn't/g, to: "isn&apos;t" },
-          { from: /aren't/g, to: "aren&apos;t" },
-          { from: /wasn't/g, to: "wasn&apos;t" },
-          { from: /weren't/g, to: "weren&apos;t" },
-          { from: /hasn't/g, to: "hasn&apos;t" },
-          { from: /haven't/g, to: "haven&apos;t" },
-          { from: /shouldn't/g, to: "shouldn&apos;t" },
-          { from: /wouldn't/g, to: "wouldn&apos;t" },
-          { from: /couldn't/g, to: "couldn&apos;t" },
-        ];
-
-        for (const fix of fixes) {
-          if (fix.from.test(content)) {
-            content = content.replace(fix.from, fix.to);
-            modified = true;
-          }
+        // Every fix below targets a "n't" contraction, so skip decoding files without one
+        const raw = await fs.readFile(file);
+        if (!raw.includes("n't")) {
+          continue;
         }
 
-        if (modified) {
-          await fs.writeFile(file, content, 'utf-8');
+        // Fix common unescaped entities in a single pass over the file
+        const content = raw.toString('utf-8');
+        const fixed = content.replace(this.UNESCAPED_CONTRACTION_PATTERN, "$1n&apos;t");
+
+        if (fixed !== content) {
+          await fs.writeFile(file, fixed, 'utf-8');
           console.log(`🔧 Fixed unescaped entities in: ${path.relative(projectPath, file)}`);
         }
       }
@@ -450,6 +493,7 @@ ECHO Application will be available at: http://localhost:${port}
     
     try {
       const items = await fs.readdir(dir, { withFileTypes: true });
+      const subdirectoryScans: Promise<string[]>[] = [];
       
       for (const item of items) {
         if (item.name.startsWith('.') || item.name === 'node_modules') {
@@ -459,12 +503,16 @@ ECHO Application will be available at: http://localhost:${port}
         const fullPath = path.join(dir, item.name);
         
         if (item.isDirectory()) {
-          const subFiles = await this.findTsxFiles(fullPath);
-          files.push(...subFiles);
-        } else if (item.name.endsWith('.tsx') || item.name.endsWith('.ts')) {
+          subdirectoryScans.push(this.findTsxFiles(fullPath));
+        } else if (this.TS_SOURCE_EXTENSIONS.has(path.extname(item.name))) {
           files.push(fullPath);
         }
       }
+
+      // Scan subdirectories concurrently instead of one at a time
+      for (const subFiles of await Promise.all(subdirectoryScans)) {
+        files.push(...subFiles);
+      }
     } catch (error) {
       // Ignore errors for individual directories
     }
@@ -2,6 +2,7 @@ import { OpenAI } from 'openai';
 import { VMProjectResult, ProjectAnalysis } from '@/types/gcp';
 import * as fs from 'fs';
 import * as path from 'path';
+import type { NodeSSH } from 'node-ssh';
 
 // Dynamically import node-ssh only on server side
 const getNodeSSH = async () => {
@@ -12,22 +13,58 @@ const getNodeSSH = async () => {
   return NodeSSH;
 };
 
+// Shared across instances, since a GCPVmService is created per request and the
+// client keeps its own pool of keep-alive connections to the API
+const openai = new OpenAI({
+  apiKey: process.env.OPENAI_API_KEY
+});
+
+// Upper bound on lines scanned from an AI command response
+const MAX_GENERATED_COMMAND_LINES = 500;
+
+// Generated commands must start with one of these programs to be executed
+const ALLOWED_COMMAND_PATTERN = /^(npm|export|cd|python|pip)/;
+
+// Printed on stdout and stderr before each setup command so the combined output
+// of a setup script can be split back into per-command parts
+const SETUP_COMMAND_MARKER = '__GG_CMD__';
+const SETUP_COMMAND_MARKER_PATTERN = /\n?__GG_CMD__\n?/;
+// Printed on stdout after each setup command with its exit code
+const SETUP_EXIT_CODE_PATTERN = /\n?__GG_RC=(\d+)\s*$/;
+
+// Longest piece of command output copied into a single log message
+const LOG_PREVIEW_LENGTH = 500;
+
+/**
+ * Shorten command output for logging, marking where it was cut
+ */
+const preview = (text: string, maxLength: number = LOG_PREVIEW_LENGTH): string =>
+  text.length > maxLength ? `${text.substring(0, maxLength)}...` : text;
+
+/**
+ * Keep the end of error or log output for logging; stack traces and npm/pip
+ * errors are printed last
+ */
+const previewTail = (text: string, maxLength: number = LOG_PREVIEW_LENGTH): string =>
+  text.length > maxLength ? `...${text.substring(text.length - maxLength)}` : text;
+
 export class GCPVmService {
   private openai: OpenAI;
   private vmInstance: string;
   private vmZone: string;
   private projectId: string;
   private vmExternalIP: string;
+  // Root of all project folders on the VM, resolved once per instance
+  private projectsBasePath: string;
   private logCallback?: (message: string) => void;
 
   constructor(logCallback?: (message: string) => void) {
-    this.openai = new OpenAI({
-      apiKey: process.env.OPENAI_API_KEY
-    });
+    this.openai = openai;
     this.vmInstance = process.env.GCP_VM_INSTANCE!;
     this.vmZone = process.env.GCP_VM_ZONE!;
     this.projectId = process.env.GCP_PROJECT_ID!;
     this.vmExternalIP = process.env.GCP_VM_EXTERNAL_IP!; // Add this to .env for now
+    this.projectsBasePath = `/home/${process.env.GCP_VM_USERNAME}/projects`;
     this.logCallback = logCallback;
   }
 
@@ -46,10 +83,10 @@ export class GCPVmService {
    */
   private getVmProjectPath(repoName: string, giteaUsername?: string): string {
     if (giteaUsername) {
-      return `/home/${process.env.GCP_VM_USERNAME}/projects/${giteaUsername}/${repoName}`;
+      return `${this.projectsBasePath}/${giteaUsername}/${repoName}`;
     } else {
       // Fallback to old structure for backward compatibility
-      return `/home/${process.env.GCP_VM_USERNAME}/projects/${repoName}`;
+      return `${this.projectsBasePath}/${repoName}`;
     }
   }
 
@@ -68,14 +105,18 @@ export class GCPVmService {
       this.log('✅ Connected to VM successfully');
       this.log('🔍 Scanning ports 8000-9000 for availability...');
 
+      // Fetch all listening sockets once instead of probing each port remotely
+      const result = await ssh.execCommand('netstat -tuln');
+      const usedPorts = new Set<number>();
+      for (const match of result.stdout.matchAll(/:(\d+)\s/g)) {
+        usedPorts.add(parseInt(match[1]));
+      }
+
       // Check for available ports starting from 8000
       for (let port = 8000; port <= 9000; port++) {
-        const result = await ssh.execCommand(`netstat -tuln | grep :${port}`);
-        if (result.stdout === '') {
+        if (!usedPorts.has(port)) {
           this.log(`✅ Found available port: ${port}`);
           return port;
-        } else {
-          this.log(`❌ Port ${port} is in use`);
         }
       }
 
@@ -156,7 +197,7 @@ npm run dev`
     });
 
     const command = response.choices[0].message.content || '';
-    this.log(`✅ Generated startup command: ${command.substring(0, 100)}${command.length > 100 ? '...' : ''}`);
+    this.log(`✅ Generated startup command: ${preview(command, 100)}`);
     return command;
   }
 
@@ -259,20 +300,22 @@ npm run dev`
         // Detect project type and handle accordingly
         this.log('📖 Analyzing project configuration...');
 
-        // Check for different project types
-        const packageJsonPath = path.join(userProjectPath, 'package.json');
-        const requirementsTxtPath = path.join(userProjectPath, 'requirements.txt');
-        const appPyPath = path.join(userProjectPath, 'app.py');
-        const mainPyPath = path.join(userProjectPath, 'main.py');
+        // Check for different project types with a single directory listing
+        const projectEntries = fs.readdirSync(userProjectPath);
+        const projectFiles = new Set(projectEntries);
+        const hasPackageJson = projectFiles.has('package.json');
+        const hasRequirementsTxt = projectFiles.has('requirements.txt');
+        const hasAppPy = projectFiles.has('app.py');
+        const hasMainPy = projectFiles.has('main.py');
 
         let projectType = 'unknown';
 
-        if (fs.existsSync(packageJsonPath)) {
+        if (hasPackageJson) {
           // Node.js project
           projectType = 'nodejs';
           this.log('🟢 Detected Node.js project (package.json found)');
 
-          const packageJson = JSON.parse(fs.readFileSync(packageJsonPath, 'utf8'));
+          const packageJson = JSON.parse(fs.readFileSync(path.join(userProjectPath, 'package.json'), 'utf8'));
 
           // Use OpenAI to analyze the project and generate appropriate commands
           this.log('🤖 Using AI to generate deployment commands...');
@@ -300,38 +343,26 @@ Do NOT include explanations, comments, or invalid commands.`
               },
               {
                 role: "user",
-                content: `Package.json for Ubuntu Linux deployment:\n${JSON.stringify(packageJson, null, 2)}\n\nGenerate minimal bash commands to run this project in development mode on port ${availablePort}.`
+                content: `Package.json for Ubuntu Linux deployment:\n${JSON.stringify(packageJson)}\n\nGenerate minimal bash commands to run this project in development mode on port ${availablePort}.`
               }
             ],
             temperature: 0.1
           });
 
-          commands = openaiResponse.choices[0].message.content?.split('\n').filter(cmd => cmd.trim() !== '' && !cmd.startsWith('#')) || [];
-
-          // Filter out any invalid commands that might cause syntax errors
-          commands = commands.filter(cmd => {
-            const trimmed = cmd.trim();
-            // Remove any commands that look like explanations or contain invalid syntax
-            return trimmed.length > 0 &&
-              !trimmed.toLowerCase().includes('as a') &&
-              !trimmed.toLowerCase().includes('please provide') &&
-              !trimmed.includes('(') &&
-              !trimmed.includes(')') &&
-              (trimmed.startsWith('npm') || trimmed.startsWith('export') || trimmed.startsWith('cd') || trimmed.startsWith('python') || trimmed.startsWith('pip'));
-          });
+          commands = this.parseGeneratedCommands(openaiResponse.choices[0].message.content);
 
           this.log(`🤖 AI generated ${commands.length} deployment commands`);
 
-        } else if (fs.existsSync(requirementsTxtPath) || fs.existsSync(appPyPath) || fs.existsSync(mainPyPath)) {
+        } else if (hasRequirementsTxt || hasAppPy || hasMainPy) {
           // Python/Flask project
           projectType = 'python';
           this.log('🐍 Detected Python/Flask project');
 
           // Determine the main file
           let mainFile = 'app.py';
-          if (fs.existsSync(appPyPath)) {
+          if (hasAppPy) {
             mainFile = 'app.py';
-          } else if (fs.existsSync(mainPyPath)) {
+          } else if (hasMainPy) {
             mainFile = 'main.py';
           }
 
@@ -349,7 +380,7 @@ Do NOT include explanations, comments, or invalid commands.`
           ];
 
           // If no requirements.txt, try basic Flask command
-          if (!fs.existsSync(requirementsTxtPath)) {
+          if (!hasRequirementsTxt) {
             this.log('⚠️ No requirements.txt found, using basic Flask setup');
             commands = [
               'python3 -m pip install --user flask',
@@ -370,7 +401,7 @@ Do NOT include explanations, comments, or invalid commands.`
           this.log('❓ Unknown project type, using AI to analyze project structure');
 
           // Get list of files in the project
-          const files = fs.readdirSync(userProjectPath).slice(0, 20); // Limit to first 20 files
+          const files = projectEntries.slice(0, 20); // Limit to first 20 files
 
           const openaiResponse = await this.openai.chat.completions.create({
             model: "gpt-4",
@@ -403,19 +434,7 @@ Do NOT include explanations, comments, or invalid commands.`
             temperature: 0.1
           });
 
-          commands = openaiResponse.choices[0].message.content?.split('\n').filter(cmd => cmd.trim() !== '' && !cmd.startsWith('#')) || [];
-
-          // Filter out any invalid commands that might cause syntax errors
-          commands = commands.filter(cmd => {
-            const trimmed = cmd.trim();
-            // Remove any commands that look like explanations or contain invalid syntax
-            return trimmed.length > 0 &&
-              !trimmed.toLowerCase().includes('as a') &&
-              !trimmed.toLowerCase().includes('please provide') &&
-              !trimmed.includes('(') &&
-              !trimmed.includes(')') &&
-              (trimmed.startsWith('npm') || trimmed.startsWith('export') || trimmed.startsWith('cd') || trimmed.startsWith('python') || trimmed.startsWith('pip'));
-          });
+          commands = this.parseGeneratedCommands(openaiResponse.choices[0].message.content);
 
           this.log(`🤖 AI analyzed project structure and generated ${commands.length} deployment commands`);
         }
@@ -423,9 +442,7 @@ Do NOT include explanations, comments, or invalid commands.`
         // If no valid commands were generated, provide fallback based on file structure
         if (commands.length === 0) {
           this.log('⚠️ No valid commands generated by AI, using fallback logic');
-          const files = fs.readdirSync(userProjectPath);
-
-          if (files.includes('package.json')) {
+          if (hasPackageJson) {
             this.log('📦 Fallback: Detected Node.js project');
             commands = [
               'npm install',
@@ -433,7 +450,7 @@ Do NOT include explanations, comments, or invalid commands.`
               `export HOST=0.0.0.0`,
               'npm run dev || npm start'
             ];
-          } else if (files.includes('requirements.txt') || files.includes('app.py')) {
+          } else if (hasRequirementsTxt || hasAppPy) {
             this.log('🐍 Fallback: Detected Python project');
             commands = [
               'pip3 install -r requirements.txt || pip3 install flask',
@@ -464,20 +481,7 @@ Do NOT include explanations, comments, or invalid commands.`
         this.log('⚠️ No setup commands to execute, proceeding directly to start command');
       }
 
-      for (let i = 0; i < setupCommands.length; i++) {
-        const command = setupCommands[i];
-        this.log(`📋 [${i + 1}/${setupCommands.length}] Running: ${command}`);
-
-        const result = await ssh.execCommand(command, { cwd: vmProjectPath });
-
-        if (result.stderr && !result.stderr.includes('npm WARN')) {
-          this.log(`⚠️ Command warning: ${result.stderr}`);
-        }
-
-        if (result.stdout) {
-          this.log(`📄 Output: ${result.stdout.substring(0, 200)}${result.stdout.length > 200 ? '...' : ''}`);
-        }
-      }
+      await this.runSetupCommands(ssh, setupCommands, vmProjectPath);
 
       // Start the server in the background (detached)
       if (startCommand) {
@@ -514,30 +518,23 @@ else
 fi
 `;
 
-        // Write the startup script to VM
-        await ssh.execCommand(`cat > ${vmProjectPath}/start_server.sh << 'EOF'
+        // Write the startup script, make it executable and run it in one round trip.
+        // The script is staged and renamed into place, so a half-written file is never run.
+        const startResult = await ssh.execCommand(`cat > ${vmProjectPath}/start_server.sh.tmp << 'EOF'
 ${startupScript}
-EOF`);
+EOF
+chmod +x ${vmProjectPath}/start_server.sh.tmp && mv -f ${vmProjectPath}/start_server.sh.tmp ${vmProjectPath}/start_server.sh && ${vmProjectPath}/start_server.sh`, { cwd: vmProjectPath });
 
-        // Make script executable and run it
-        await ssh.execCommand(`chmod +x ${vmProjectPath}/start_server.sh`);
-        const startResult = await ssh.execCommand(`${vmProjectPath}/start_server.sh`, { cwd: vmProjectPath });
-
-        this.log(`🎯 Server startup result: ${startResult.stdout}`);
+        // On failure this output ends with server.log, the only diagnostic left, so keep it whole
+        const startOutput = startResult.code === 0 ? preview(startResult.stdout) : startResult.stdout;
+        this.log(`🎯 Server startup result: ${startOutput}`);
         if (startResult.stderr) {
-          this.log(`⚠️ Server startup stderr: ${startResult.stderr}`);
+          this.log(`⚠️ Server startup stderr: ${previewTail(startResult.stderr)}`);
         }
 
-        // Additional verification - check if the process is actually running
-        await new Promise(resolve => setTimeout(resolve, 2000)); // Wait 2 seconds
-        const verifyResult = await ssh.execCommand(`ps aux | grep "${availablePort}" | grep -v grep`);
-        if (verifyResult.stdout) {
-          this.log(`✅ Server verification: Process found running on port ${availablePort}`);
-        } else {
-          this.log(`⚠️ Server verification: No process found on port ${availablePort}`);
-          // Try to get server logs for debugging
-          const logResult = await ssh.execCommand(`cat ${vmProjectPath}/server.log 2>/dev/null || echo "No log file"`, { cwd: vmProjectPath });
-          this.log(`📄 Server logs: ${logResult.stdout}`);
+        // start_server.sh already verifies the PID and prints server.log on failure
+        if (startResult.code !== 0) {
+          this.log(`⚠️ Server verification: startup script exited with code ${startResult.code}`);
         }
       }
 
@@ -583,6 +580,98 @@ export PORT=${port}
 ${bashContent}`;
   }
 
+  /**
+   * Run setup commands as one shell script over a single exec.
+   * Each command runs in its own subshell, so cd and export do not leak into the
+   * next one, and a failing command does not stop the rest, as when each was sent
+   * separately. Marker lines split the output back up so every command is logged
+   * with its own output, warnings and exit code.
+   * @param ssh - Connected NodeSSH instance
+   * @param setupCommands - Commands to run before the server start command
+   * @param cwd - Project directory the script starts in
+   */
+  private async runSetupCommands(ssh: NodeSSH, setupCommands: string[], cwd: string): Promise<void> {
+    if (setupCommands.length === 0) {
+      return;
+    }
+
+    const script = setupCommands
+      .map(command => [
+        `printf '\\n${SETUP_COMMAND_MARKER}\\n'; printf '\\n${SETUP_COMMAND_MARKER}\\n' >&2`,
+        '(',
+        command,
+        ')',
+        'echo "__GG_RC=$?"'
+      ].join('\n'))
+      .join('\n');
+
+    const result = await ssh.execCommand(script, { cwd });
+
+    // Anything before the first marker is shell noise, not command output
+    const stdoutParts = result.stdout.split(SETUP_COMMAND_MARKER_PATTERN).slice(1);
+    const stderrParts = result.stderr.split(SETUP_COMMAND_MARKER_PATTERN).slice(1);
+
+    setupCommands.forEach((command, i) => {
+      this.log(`📋 [${i + 1}/${setupCommands.length}] Running: ${command}`);
+
+      if (i >= stdoutParts.length) {
+        this.log('⚠️ Command did not run');
+        return;
+      }
+
+      const exitCodeMatch = stdoutParts[i].match(SETUP_EXIT_CODE_PATTERN);
+      const exitCode = exitCodeMatch ? exitCodeMatch[1] : '0';
+      const failed = exitCode !== '0';
+      const stdout = stdoutParts[i].replace(SETUP_EXIT_CODE_PATTERN, '').trim();
+      const stderr = (stderrParts[i] || '').trim();
+
+      if (stderr && !stderr.includes('npm WARN')) {
+        this.log(`⚠️ Command warning: ${previewTail(stderr)}`);
+      }
+
+      // A failing command explains itself at the end of its output
+      if (stdout) {
+        this.log(`📄 Output: ${failed ? previewTail(stdout) : preview(stdout, 200)}`);
+      }
+
+      if (failed) {
+        this.log(`❌ Command exited with code ${exitCode}`);
+      }
+    });
+  }
+
+  /**
+   * Extract runnable shell commands from an AI response in a single pass.
+   * Comments, explanations and anything with parentheses are dropped; only
+   * npm/export/cd/python/pip lines are kept.
+   * @param content - Raw completion text
+   * @returns Trimmed commands, scanning at most MAX_GENERATED_COMMAND_LINES lines
+   */
+  private parseGeneratedCommands(content: string | null | undefined): string[] {
+    if (!content) {
+      return [];
+    }
+
+    const commands: string[] = [];
+    const lines = content.split('\n', MAX_GENERATED_COMMAND_LINES);
+
+    for (const line of lines) {
+      const trimmed = line.trim();
+      if (!ALLOWED_COMMAND_PATTERN.test(trimmed) || trimmed.includes('(') || trimmed.includes(')')) {
+        continue;
+      }
+
+      const lower = trimmed.toLowerCase();
+      if (lower.includes('as a') || lower.includes('please provide')) {
+        continue;
+      }
+
+      commands.push(trimmed);
+    }
+
+    return commands;
+  }
+
   async getVmExternalIP(): Promise<string> {
     // For now, return the configured external IP
     // In production, you'd want to fetch this dynamically from GCP
@@ -669,8 +758,8 @@ ${bashContent}`;
 
       const vmProjectPath = this.getVmProjectPath(repoName, giteaUsername);
 
-      // Get server logs
-      const logResult = await ssh.execCommand(`cat ${vmProjectPath}/server.log 2>/dev/null || echo "No server log file found"`);
+      // Get the tail of the server log; a long-running dev server can grow it without bound
+      const logResult = await ssh.execCommand(`tail -n 500 ${vmProjectPath}/server.log 2>/dev/null || echo "No server log file found"`);
 
       return logResult.stdout || 'No logs available';
 
@@ -756,74 +845,93 @@ ${bashContent}`;
         privateKeyPath: process.env.GCP_VM_SSH_KEY_PATH!
       });
 
-      const userProjectsPath = `/home/${process.env.GCP_VM_USERNAME}/projects/${giteaUsername}`;
-      
-      // Check if user directory exists
-      const userDirCheck = await ssh.execCommand(`test -d ${userProjectsPath} && echo "exists" || echo "not_found"`);
-      
-      if (userDirCheck.stdout.trim() === 'not_found') {
-        this.log(`📁 No projects directory found for user: ${giteaUsername}`);
-        return {
-          username: giteaUsername,
-          userPath: userProjectsPath,
-          projects: []
-        };
-      }
-
-      // List all directories in user's projects folder
-      const listResult = await ssh.execCommand(`ls -la ${userProjectsPath} | grep '^d' | grep -v '\\.$' | awk '{print $9}'`);
-      
-      if (!listResult.stdout.trim()) {
-        this.log(`📂 User directory exists but no projects found for: ${giteaUsername}`);
-        return {
-          username: giteaUsername,
-          userPath: userProjectsPath,
-          projects: []
-        };
-      }
-
-      const projectNames = listResult.stdout.trim().split('\n').filter((name: string) => name && name !== '.' && name !== '..');
-      const projects = [];
+      return await this.collectUserProjects(ssh, giteaUsername);
 
-      for (const projectName of projectNames) {
-        const projectPath = `${userProjectsPath}/${projectName}`;
-        
-        // Check if project is running
-        const pidCheck = await ssh.execCommand(`test -f ${projectPath}/server.pid && cat ${projectPath}/server.pid || echo "not_running"`);
-        let isRunning = false;
-        
-        if (pidCheck.stdout.trim() !== 'not_running') {
-          const pid = pidCheck.stdout.trim();
-          const processCheck = await ssh.execCommand(`ps -p ${pid} > /dev/null 2>&1 && echo "running" || echo "stopped"`);
-          isRunning = processCheck.stdout.trim() === 'running';
-        }
-
-        // Get last modified time
-        const modTimeResult = await ssh.execCommand(`stat -c %y ${projectPath} 2>/dev/null || echo "unknown"`);
-        const lastModified = modTimeResult.stdout.trim() !== 'unknown' ? modTimeResult.stdout.trim() : undefined;
+    } catch (error) {
+      this.log(`❌ Error listing projects for user ${giteaUsername}: ${error instanceof Error ? error.message : 'Unknown error'}`);
+      throw error;
+    } finally {
+      ssh.dispose();
+    }
+  }
 
-        projects.push({
-          name: projectName,
-          path: projectPath,
-          isRunning,
-          lastModified
-        });
-      }
+  /**
+   * List a user's projects over an already connected SSH session
+   * @param ssh - Connected NodeSSH instance, owned by the caller
+   * @param giteaUsername - Gitea username to list projects for
+   * @returns Project information for the user
+   */
+  private async collectUserProjects(ssh: NodeSSH, giteaUsername: string): Promise<{
+    username: string;
+    userPath: string;
+    projects: Array<{
+      name: string;
+      path: string;
+      isRunning: boolean;
+      lastModified?: string;
+    }>;
+  }> {
+    const userProjectsPath = `${this.projectsBasePath}/${giteaUsername}`;
+    
+    // Check if user directory exists
+    const userDirCheck = await ssh.execCommand(`test -d ${userProjectsPath} && echo "exists" || echo "not_found"`);
+    
+    if (userDirCheck.stdout.trim() === 'not_found') {
+      this.log(`📁 No projects directory found for user: ${giteaUsername}`);
+      return {
+        username: giteaUsername,
+        userPath: userProjectsPath,
+        projects: []
+      };
+    }
 
-      this.log(`✅ Found ${projects.length} projects for user ${giteaUsername}`);
-      
+    // List all directories in user's projects folder
+    const listResult = await ssh.execCommand(`find ${userProjectsPath} -mindepth 1 -maxdepth 1 -type d -printf '%f\\n'`);
+    
+    if (!listResult.stdout.trim()) {
+      this.log(`📂 User directory exists but no projects found for: ${giteaUsername}`);
       return {
         username: giteaUsername,
         userPath: userProjectsPath,
-        projects
+        projects: []
       };
+    }
 
-    } catch (error) {
-      this.log(`❌ Error listing projects for user ${giteaUsername}: ${error instanceof Error ? error.message : 'Unknown error'}`);
-      throw error;
-    } finally {
-      ssh.dispose();
+    const projectNames = listResult.stdout.trim().split('\n').filter((name: string) => name);
+    const projects = [];
+
+    for (const projectName of projectNames) {
+      const projectPath = `${userProjectsPath}/${projectName}`;
+      
+      // Check if project is running
+      const pidCheck = await ssh.execCommand(`test -f ${projectPath}/server.pid && cat ${projectPath}/server.pid || echo "not_running"`);
+      let isRunning = false;
+      
+      if (pidCheck.stdout.trim() !== 'not_running') {
+        const pid = pidCheck.stdout.trim();
+        const processCheck = await ssh.execCommand(`ps -p ${pid} > /dev/null 2>&1 && echo "running" || echo "stopped"`);
+        isRunning = processCheck.stdout.trim() === 'running';
+      }
+
+      // Get last modified time
+      const modTimeResult = await ssh.execCommand(`stat -c %y ${projectPath} 2>/dev/null || echo "unknown"`);
+      const lastModified = modTimeResult.stdout.trim() !== 'unknown' ? modTimeResult.stdout.trim() : undefined;
+
+      projects.push({
+        name: projectName,
+        path: projectPath,
+        isRunning,
+        lastModified
+      });
     }
+
+    this.log(`✅ Found ${projects.length} projects for user ${giteaUsername}`);
+    
+    return {
+      username: giteaUsername,
+      userPath: userProjectsPath,
+      projects
+    };
   }
 
   /**
@@ -853,7 +961,7 @@ ${bashContent}`;
         privateKeyPath: process.env.GCP_VM_SSH_KEY_PATH!
       });
 
-      const projectsBasePath = `/home/${process.env.GCP_VM_USERNAME}/projects`;
+      const projectsBasePath = this.projectsBasePath;
       
       // Check if projects directory exists
       const projectsDirCheck = await ssh.execCommand(`test -d ${projectsBasePath} && echo "exists" || echo "not_found"`);
@@ -864,14 +972,14 @@ ${bashContent}`;
       }
 
       // List all user directories and individual project folders (for backward compatibility)
-      const listResult = await ssh.execCommand(`ls -la ${projectsBasePath} | grep '^d' | grep -v '\\.$' | awk '{print $9}'`);
+      const listResult = await ssh.execCommand(`find ${projectsBasePath} -mindepth 1 -maxdepth 1 -type d -printf '%f\\n'`);
       
       if (!listResult.stdout.trim()) {
         this.log(`📂 Projects directory exists but is empty`);
         return [];
       }
 
-      const entries = listResult.stdout.trim().split('\n').filter((name: string) => name && name !== '.' && name !== '..');
+      const entries = listResult.stdout.trim().split('\n').filter((name: string) => name);
       const allProjects = [];
 
       for (const entry of entries) {
@@ -882,8 +990,8 @@ ${bashContent}`;
         const subDirCount = parseInt(subDirCheck.stdout.trim()) - 1; // Subtract 1 for the directory itself
 
         if (subDirCount > 0) {
-          // This is likely a user directory with projects
-          const userProjects = await this.listUserProjects(entry);
+          // This is likely a user directory with projects; reuse this connection
+          const userProjects = await this.collectUserProjects(ssh, entry);
           allProjects.push(userProjects);
         } else {
           // This is likely a legacy direct project folder
@@ -993,19 +1101,24 @@ ${bashContent}`;
       this.log('📖 Analyzing existing project structure on VM...');
       
       const fileListResult = await ssh.execCommand(`ls -la ${vmProjectPath}`, { cwd: vmProjectPath });
-      this.log(`📄 Files in project directory: ${fileListResult.stdout}`);
+      this.log(`📄 Files in project directory: ${preview(fileListResult.stdout)}`);
 
       let commands: string[] = [];
       let projectType = 'unknown';
 
-      // Check for different project types on VM
-      const packageJsonExists = await ssh.execCommand(`test -f ${vmProjectPath}/package.json && echo "exists" || echo "not_found"`);
-      const requirementsTxtExists = await ssh.execCommand(`test -f ${vmProjectPath}/requirements.txt && echo "exists" || echo "not_found"`);
-      const appPyExists = await ssh.execCommand(`test -f ${vmProjectPath}/app.py && echo "exists" || echo "not_found"`);
-      const mainPyExists = await ssh.execCommand(`test -f ${vmProjectPath}/main.py && echo "exists" || echo "not_found"`);
-      const startShExists = await ssh.execCommand(`test -f ${vmProjectPath}/start.sh && echo "exists" || echo "not_found"`);
-
-      if (startShExists.stdout.trim() === 'exists') {
+      // Check for different project types on VM, printing each marker file that exists
+      const markerResult = await ssh.execCommand(
+        `for f in package.json requirements.txt app.py main.py start.sh; do [ -f "$f" ] && echo "$f"; done`,
+        { cwd: vmProjectPath }
+      );
+      const markerFiles = new Set(markerResult.stdout.split('\n').map((name: string) => name.trim()));
+      const packageJsonExists = markerFiles.has('package.json');
+      const requirementsTxtExists = markerFiles.has('requirements.txt');
+      const appPyExists = markerFiles.has('app.py');
+      const mainPyExists = markerFiles.has('main.py');
+      const startShExists = markerFiles.has('start.sh');
+
+      if (startShExists) {
         // Use existing start.sh script
         this.log('✅ Found existing start.sh, using direct execution');
         projectType = 'custom';
@@ -1015,7 +1128,7 @@ ${bashContent}`;
           'chmod +x start.sh',
           './start.sh'
         ];
-      } else if (packageJsonExists.stdout.trim() === 'exists') {
+      } else if (packageJsonExists) {
         // Node.js project
         projectType = 'nodejs';
         this.log('🟢 Detected Node.js project (package.json found on VM)');
@@ -1057,24 +1170,13 @@ Do NOT include explanations, comments, or invalid commands.`
               },
               {
                 role: "user",
-                content: `Package.json for restarting existing project on Ubuntu Linux VM:\n${JSON.stringify(packageJson, null, 2)}\n\nGenerate minimal bash commands to restart this project in development mode on port ${availablePort}.`
+                content: `Package.json for restarting existing project on Ubuntu Linux VM:\n${JSON.stringify(packageJson)}\n\nGenerate minimal bash commands to restart this project in development mode on port ${availablePort}.`
               }
             ],
             temperature: 0.1
           });
 
-          commands = openaiResponse.choices[0].message.content?.split('\n').filter(cmd => cmd.trim() !== '' && !cmd.startsWith('#')) || [];
-
-          // Filter out any invalid commands
-          commands = commands.filter(cmd => {
-            const trimmed = cmd.trim();
-            return trimmed.length > 0 &&
-              !trimmed.toLowerCase().includes('as a') &&
-              !trimmed.toLowerCase().includes('please provide') &&
-              !trimmed.includes('(') &&
-              !trimmed.includes(')') &&
-              (trimmed.startsWith('npm') || trimmed.startsWith('export') || trimmed.startsWith('cd') || trimmed.startsWith('python') || trimmed.startsWith('pip'));
-          });
+          commands = this.parseGeneratedCommands(openaiResponse.choices[0].message.content);
 
           this.log(`🤖 AI generated ${commands.length} restart commands`);
         } catch (jsonError) {
@@ -1086,23 +1188,23 @@ Do NOT include explanations, comments, or invalid commands.`
             'npm run dev -- --hostname 0.0.0.0 || HOST=0.0.0.0 npm start'
           ];
         }
-      } else if (requirementsTxtExists.stdout.trim() === 'exists' || appPyExists.stdout.trim() === 'exists' || mainPyExists.stdout.trim() === 'exists') {
+      } else if (requirementsTxtExists || appPyExists || mainPyExists) {
         // Python/Flask project
         projectType = 'python';
         this.log('🐍 Detected Python/Flask project on VM');
 
         // Determine the main file
         let mainFile = 'app.py';
-        if (appPyExists.stdout.trim() === 'exists') {
+        if (appPyExists) {
           mainFile = 'app.py';
-        } else if (mainPyExists.stdout.trim() === 'exists') {
+        } else if (mainPyExists) {
           mainFile = 'main.py';
         }
 
         this.log(`🎯 Using main file: ${mainFile}`);
 
         // Generate Python/Flask restart commands
-        if (requirementsTxtExists.stdout.trim() === 'exists') {
+        if (requirementsTxtExists) {
           commands = [
             'python3 -m pip install --user -r requirements.txt',
             `export FLASK_APP=${mainFile}`,
@@ -1165,20 +1267,7 @@ Do NOT include explanations, comments, or invalid commands.`
       const setupCommands = commands.slice(0, -1);
       const startCommand = commands[commands.length - 1];
 
-      for (let i = 0; i < setupCommands.length; i++) {
-        const command = setupCommands[i];
-        this.log(`📋 [${i + 1}/${setupCommands.length}] Running: ${command}`);
-
-        const result = await ssh.execCommand(command, { cwd: vmProjectPath });
-
-        if (result.stderr && !result.stderr.includes('npm WARN')) {
-          this.log(`⚠️ Command warning: ${result.stderr}`);
-        }
-
-        if (result.stdout) {
-          this.log(`📄 Output: ${result.stdout.substring(0, 200)}${result.stdout.length > 200 ? '...' : ''}`);
-        }
-      }
+      await this.runSetupCommands(ssh, setupCommands, vmProjectPath);
 
       // Start the server in the background
       if (startCommand) {
@@ -1207,28 +1296,23 @@ else
 fi
 `;
 
-        // Write and execute the restart script
-        await ssh.execCommand(`cat > ${vmProjectPath}/restart_server.sh << 'EOF'
+        // Write, make executable and run the restart script in one round trip.
+        // The script is staged and renamed into place, so a half-written file is never run.
+        const startResult = await ssh.execCommand(`cat > ${vmProjectPath}/restart_server.sh.tmp << 'EOF'
 ${restartScript}
-EOF`);
-
-        await ssh.execCommand(`chmod +x ${vmProjectPath}/restart_server.sh`);
-        const startResult = await ssh.execCommand(`${vmProjectPath}/restart_server.sh`, { cwd: vmProjectPath });
+EOF
+chmod +x ${vmProjectPath}/restart_server.sh.tmp && mv -f ${vmProjectPath}/restart_server.sh.tmp ${vmProjectPath}/restart_server.sh && ${vmProjectPath}/restart_server.sh`, { cwd: vmProjectPath });
 
-        this.log(`🎯 Server restart result: ${startResult.stdout}`);
+        // On failure this output ends with server.log, the only diagnostic left, so keep it whole
+        const startOutput = startResult.code === 0 ? preview(startResult.stdout) : startResult.stdout;
+        this.log(`🎯 Server restart result: ${startOutput}`);
         if (startResult.stderr) {
-          this.log(`⚠️ Server restart stderr: ${startResult.stderr}`);
+          this.log(`⚠️ Server restart stderr: ${previewTail(startResult.stderr)}`);
         }
 
-        // Verification
-        await new Promise(resolve => setTimeout(resolve, 2000));
-        const verifyResult = await ssh.execCommand(`ps aux | grep "${availablePort}" | grep -v grep`);
-        if (verifyResult.stdout) {
-          this.log(`✅ Server verification: Process found running on port ${availablePort}`);
-        } else {
-          this.log(`⚠️ Server verification: No process found on port ${availablePort}`);
-          const logResult = await ssh.execCommand(`cat ${vmProjectPath}/server.log 2>/dev/null || echo "No log file"`);
-          this.log(`📄 Server logs: ${logResult.stdout}`);
+        // restart_server.sh already verifies the PID and prints server.log on failure
+        if (startResult.code !== 0) {
+          this.log(`⚠️ Server verification: restart script exited with code ${startResult.code}`);
         }
       }
 
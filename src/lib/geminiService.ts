@@ -1,7 +1,15 @@
 import { GoogleGenerativeAI } from '@google/generative-ai';
-import { NodeSSH } from 'node-ssh';
 import path from 'path';
 
+// Dynamically import node-ssh only on server side
+const getNodeSSH = async () => {
+  if (typeof window !== 'undefined') {
+    throw new Error('SSH operations are only available on the server side');
+  }
+  const { NodeSSH } = await import('node-ssh');
+  return NodeSSH;
+};
+
 export interface ProjectContext {
   projectPath: string;
   giteaUsername: string;
@@ -27,9 +35,50 @@ export interface ChatMessage {
   timestamp: Date;
 }
 
+// Directories pruned from the project scan so their subtrees are never walked
+const IGNORED_DIRECTORIES = ['node_modules', '.git', '.next', 'dist', 'build', 'coverage', '__pycache__', 'venv', '.venv'];
+
+// Per-request tracing is only written when GEMINI_DEBUG is set
+const DEBUG_LOGGING = !!process.env.GEMINI_DEBUG;
+const debugLog: (...args: unknown[]) => void = DEBUG_LOGGING ? console.log.bind(console) : () => {};
+
+// File patterns that are read to build the project context
+const CONTEXT_FILE_PATTERNS = [
+  '*.py', '*.js', '*.jsx', '*.ts', '*.tsx', '*.json', '*.md', '*.txt',
+  '*.yml', '*.yaml', '*.html', '*.css', 'Dockerfile', 'requirements.txt'
+];
+
+// Language label per file extension, used for main files in the prompt
+const LANGUAGE_BY_EXTENSION: Record<string, string> = {
+  '.js': 'javascript',
+  '.jsx': 'javascript',
+  '.ts': 'typescript',
+  '.tsx': 'typescript',
+  '.py': 'python',
+  '.html': 'html',
+  '.css': 'css',
+  '.json': 'json',
+  '.md': 'markdown',
+  '.yml': 'yaml',
+  '.yaml': 'yaml',
+  '.txt': 'text'
+};
+
+const MAX_CONTEXT_FILES = 50;
+const MAX_CONTEXT_DIRECTORIES = 20;
+// Byte cap per file read. A UTF-8 character takes up to 4 bytes, so 4 x the 5000
+// character context limit still yields more than 5000 characters whenever the file is
+// longer, and the '...[truncated]' marker is added. A multi-byte character split by
+// the cap always lies past that limit and is cut off with the rest.
+const MAX_CONTEXT_FILE_BYTES = 4 * 5000;
+// Upper bound on cached file contents across all projects; must stay above MAX_CONTEXT_FILES
+const MAX_CACHED_FILES = 500;
+
 export class GeminiService {
   private genAI: GoogleGenerativeAI;
   private model: any;
+  // LRU of file contents keyed by absolute VM path, invalidated when the mtime changes
+  private fileContentCache = new Map<string, { mtime: string; content: string }>();
 
   constructor() {
     if (!process.env.GEMINI_API_KEY) {
@@ -47,53 +96,100 @@ export class GeminiService {
    * Get project context from GCP VM
    */
   async getProjectContext(giteaUsername: string, projectName: string): Promise<ProjectContext> {
+    const NodeSSH = await getNodeSSH();
     const ssh = new NodeSSH();
 
     try {
-      console.log('Getting project context for:', { giteaUsername, projectName });
+      debugLog('Getting project context for:', { giteaUsername, projectName });
       
       // Connect to VM
-      console.log('Connecting to VM...');
+      debugLog('Connecting to VM...');
       await ssh.connect({
         host: process.env.GCP_VM_EXTERNAL_IP!,
         username: process.env.GCP_VM_USERNAME!,
         privateKeyPath: process.env.GCP_VM_SSH_KEY_PATH!
       });
-      console.log('Connected to VM successfully');
+      debugLog('Connected to VM successfully');
 
       const projectPath = `/home/${process.env.GCP_VM_USERNAME}/projects/${giteaUsername}/${projectName}`;
-      console.log('Project path:', projectPath);
+      debugLog('Project path:', projectPath);
       
-      // Check if project exists
-      const projectExists = await ssh.execCommand(`test -d ${projectPath} && echo "exists" || echo "not_found"`);
-      console.log('Project exists check:', projectExists.stdout.trim());
+      // Check the project exists and get its files and directories in a single round trip
+      debugLog('Getting file structure...');
+      const scanResult = await ssh.execCommand(
+        `test -d ${projectPath} || { echo "not_found"; exit; }; ${this.buildProjectScanCommand(projectPath)}`
+      );
       
-      if (projectExists.stdout.trim() === 'not_found') {
+      if (scanResult.stdout.trim() === 'not_found') {
         throw new Error(`Project not found at path: ${projectPath}`);
       }
 
-      // Get project file structure
-      console.log('Getting file structure...');
-      const filesResult = await ssh.execCommand(`find ${projectPath} -type f -name "*.py" -o -name "*.js" -o -name "*.jsx" -o -name "*.ts" -o -name "*.tsx" -o -name "*.json" -o -name "*.md" -o -name "*.txt" -o -name "*.yml" -o -name "*.yaml" -o -name "*.html" -o -name "*.css" -o -name "Dockerfile" -o -name "requirements.txt" | head -50`);
-      
-      console.log('Files found:', filesResult.stdout ? 'Yes' : 'None');
-      const filePaths = filesResult.stdout.trim().split('\n').filter(p => p);
-      console.log('File paths count:', filePaths.length);
+      const scannedFiles: Array<{ filePath: string; relativePath: string; mtime: string }> = [];
+      const directoryPaths: string[] = [];
+      for (const line of scanResult.stdout.split('\n')) {
+        // Each line is "<type> <mtime> <path relative to projectPath>"
+        const pathStart = line.indexOf(' ', 2) + 1;
+        const relativePath = pathStart > 0 ? line.slice(pathStart) : '';
+        if (!relativePath) continue;
+
+        if (line[0] === 'f' && scannedFiles.length < MAX_CONTEXT_FILES) {
+          scannedFiles.push({
+            filePath: `${projectPath}/${relativePath}`,
+            relativePath,
+            mtime: line.slice(2, pathStart - 1)
+          });
+        } else if (line[0] === 'd' && directoryPaths.length < MAX_CONTEXT_DIRECTORIES) {
+          directoryPaths.push(relativePath);
+        }
+      }
+      debugLog('File paths count:', scannedFiles.length);
       
       const files: ProjectContext['files'] = [];
       const mainFiles: ProjectContext['mainFiles'] = [];
       let packageJson: any = null;
       let readme: string = '';
 
+      // Read every file missing from the cache in a single SSH round trip,
+      // separating the outputs with NUL bytes. NULs inside a file, as in UTF-16 text,
+      // are stripped so they cannot shift the later outputs.
+      const uncachedContents = new Map<string, string>();
+      const staleFiles = scannedFiles.filter(({ filePath, mtime }) => {
+        const cached = this.fileContentCache.get(filePath);
+        if (!cached || cached.mtime !== mtime) {
+          return true;
+        }
+        this.cacheFileContent(filePath, cached.mtime, cached.content);
+        return false;
+      });
+      if (staleFiles.length > 0) {
+        const readCommand = staleFiles
+          .map(({ filePath }) => `head -100 "${filePath}" 2>/dev/null | tr -d '\\0' | head -c ${MAX_CONTEXT_FILE_BYTES}; printf '\\0'`) // Limit to first 100 lines
+          .join('; ');
+        const readResult = await ssh.execCommand(readCommand);
+        const contents = readResult.stdout.split('\0');
+        // Only trust the split when every file produced exactly one output;
+        // otherwise nothing is cached and the files are analyzed without content
+        const complete = contents.length === staleFiles.length + 1;
+        if (!complete) {
+          console.warn(`Expected ${staleFiles.length} file outputs, got ${contents.length - 1}; not caching file contents`);
+        }
+        staleFiles.forEach(({ filePath, mtime }, index) => {
+          if (complete) {
+            this.cacheFileContent(filePath, mtime, contents[index].trim());
+          } else {
+            uncachedContents.set(filePath, '');
+          }
+        });
+      }
+
       // Read important files
-      for (const filePath of filePaths) {
-        const fileName = path.basename(filePath);
-        const relativePath = filePath.replace(projectPath + '/', '');
+      for (const { filePath, relativePath } of scannedFiles) {
+        // The scan already produced the relative path, so slice the name from it
+        const fileName = relativePath.slice(relativePath.lastIndexOf('/') + 1);
         
         try {
-          // Read file content for analysis
-          const contentResult = await ssh.execCommand(`cat ${filePath} 2>/dev/null | head -100`); // Limit to first 100 lines
-          const content = contentResult.stdout;
+          // File content for analysis, fetched above or reused from the cache
+          const content = uncachedContents.get(filePath) ?? this.fileContentCache.get(filePath)!.content;
 
           files.push({
             name: fileName,
@@ -103,22 +199,23 @@ export class GeminiService {
           });
 
           // Collect main files for context
-          if (fileName.toLowerCase().includes('main') || 
-              fileName.toLowerCase().includes('app') || 
-              fileName.toLowerCase().includes('index') ||
-              fileName.toLowerCase() === 'readme.md' ||
-              fileName.toLowerCase() === 'package.json' ||
-              fileName.toLowerCase() === 'requirements.txt') {
+          const lowerName = fileName.toLowerCase();
+          if (lowerName.includes('main') || 
+              lowerName.includes('app') || 
+              lowerName.includes('index') ||
+              lowerName === 'readme.md' ||
+              lowerName === 'package.json' ||
+              lowerName === 'requirements.txt') {
             
             const language = this.getFileLanguage(fileName);
             
-            if (fileName.toLowerCase() === 'package.json') {
+            if (lowerName === 'package.json') {
               try {
                 packageJson = JSON.parse(content);
               } catch (e) {
                 console.warn('Failed to parse package.json');
               }
-            } else if (fileName.toLowerCase() === 'readme.md') {
+            } else if (lowerName === 'readme.md') {
               readme = content;
             } else if (content.trim()) {
               mainFiles.push({
@@ -139,19 +236,16 @@ export class GeminiService {
         }
       }
 
-      // Get directory structure
-      const dirResult = await ssh.execCommand(`find ${projectPath} -type d | head -20`);
-      const directories = dirResult.stdout.trim().split('\n')
-        .filter(p => p && p !== projectPath)
-        .map(dirPath => ({
-          name: path.basename(dirPath),
-          path: dirPath.replace(projectPath + '/', ''),
-          isDirectory: true
-        }));
+      // Add directory structure collected during the scan
+      const directories = directoryPaths.map(dirPath => ({
+        name: path.basename(dirPath),
+        path: dirPath,
+        isDirectory: true
+      }));
 
       files.push(...directories);
 
-      console.log('Project context loaded:', {
+      debugLog('Project context loaded:', {
         totalFiles: files.length,
         mainFiles: mainFiles.length,
         hasPackageJson: !!packageJson,
@@ -176,6 +270,35 @@ export class GeminiService {
     }
   }
 
+  /**
+   * Store file content as the most recently used cache entry, evicting the oldest when full
+   */
+  private cacheFileContent(filePath: string, mtime: string, content: string): void {
+    // Maps iterate in insertion order, so re-inserting moves the entry to the end
+    this.fileContentCache.delete(filePath);
+    this.fileContentCache.set(filePath, { mtime, content });
+    if (this.fileContentCache.size > MAX_CACHED_FILES) {
+      this.fileContentCache.delete(this.fileContentCache.keys().next().value!);
+    }
+  }
+
+  /**
+   * Build a single find command that lists context files and directories,
+   * pruning ignored directories before they are descended into. The output is
+   * capped by awk, which exits once both limits are reached so find stops
+   * walking the rest of the tree on SIGPIPE.
+   */
+  private buildProjectScanCommand(projectPath: string): string {
+    const prune = IGNORED_DIRECTORIES.map(name => `-name "${name}"`).join(' -o ');
+    const patterns = CONTEXT_FILE_PATTERNS.map(pattern => `-name "${pattern}"`).join(' -o ');
+    // Lines with fewer than three fields are the project root itself
+    const limit = `awk 'NF < 3 { next } ` +
+      `$1 == "f" && f < ${MAX_CONTEXT_FILES} { f++; print } ` +
+      `$1 == "d" && d < ${MAX_CONTEXT_DIRECTORIES} { d++; print } ` +
+      `f >= ${MAX_CONTEXT_FILES} && d >= ${MAX_CONTEXT_DIRECTORIES} { exit }'`;
+    return `find ${projectPath} \\( ${prune} \\) -prune -o \\( -type d -o -type f \\( ${patterns} \\) \\) -printf '%y %T@ %P\\n' | ${limit}`;
+  }
+
   /**
    * Generate AI response with project context
    */
@@ -184,7 +307,7 @@ export class GeminiService {
     projectContext: ProjectContext
   ): Promise<string> {
     try {
-      console.log('Generating response with context:', {
+      debugLog('Generating response with context:', {
         projectName: projectContext.projectName,
         filesCount: projectContext.files.length,
         hasPackageJson: !!projectContext.packageJson,
@@ -212,13 +335,15 @@ ${conversationHistory}
 
 Please respond to the user's question about their project. Keep your response focused on the project context provided above. Be helpful, accurate, and concise.`;
 
-      console.log('Sending prompt to Gemini (first 500 chars):', fullPrompt.substring(0, 500));
+      if (DEBUG_LOGGING) {
+        debugLog('Sending prompt to Gemini (first 500 chars):', fullPrompt.substring(0, 500));
+      }
 
       const result = await this.model.generateContent(fullPrompt);
       const response = await result.response;
       
       const responseText = response.text();
-      console.log('Received response from Gemini:', responseText ? 'Success' : 'Empty response');
+      debugLog('Received response from Gemini:', responseText ? 'Success' : 'Empty response');
       
       if (!responseText || responseText.trim() === '') {
         throw new Error('Received empty response from Gemini API');
@@ -252,71 +377,72 @@ Please respond to the user's question about their project. Keep your response fo
    * Build context prompt from project information
    */
   private buildContextPrompt(context: ProjectContext): string {
-    let prompt = `You are an AI assistant helping a developer with their project. Here's the context of their current project:
+    const parts: string[] = [];
+    parts.push(`You are an AI assistant helping a developer with their project. Here's the context of their current project:
 
 PROJECT INFORMATION:
 - Project Name: ${context.projectName}
 - Owner: ${context.giteaUsername}
 - Project Path: ${context.projectPath}
 
-`;
+`);
 
     // Add package.json info if available
     if (context.packageJson) {
-      prompt += `PACKAGE.JSON INFORMATION:
+      parts.push(`PACKAGE.JSON INFORMATION:
 - Name: ${context.packageJson.name || 'N/A'}
 - Version: ${context.packageJson.version || 'N/A'}
 - Description: ${context.packageJson.description || 'N/A'}
 - Main Dependencies: ${context.packageJson.dependencies ? Object.keys(context.packageJson.dependencies).slice(0, 10).join(', ') : 'None'}
 - Scripts: ${context.packageJson.scripts ? Object.keys(context.packageJson.scripts).join(', ') : 'None'}
 
-`;
+`);
     }
 
     // Add README if available (but limit size)
     if (context.readme) {
       const readmePreview = context.readme.substring(0, 800);
-      prompt += `README CONTENT:
+      parts.push(`README CONTENT:
 ${readmePreview}${context.readme.length > 800 ? '...[truncated]' : ''}
 
-`;
+`);
     }
 
     // Add main files content (but be more conservative with size)
     if (context.mainFiles.length > 0) {
-      prompt += `MAIN PROJECT FILES:
-`;
+      parts.push(`MAIN PROJECT FILES:
+`);
       // Limit to first 3 main files to avoid token issues
       context.mainFiles.slice(0, 3).forEach(file => {
         const fileContent = file.content.substring(0, 1000); // Limit each file content
-        prompt += `
+        parts.push(`
 File: ${file.name} (${file.language})
 Content:
 ${fileContent}${file.content.length > 1000 ? '...[truncated]' : ''}
 
-`;
+`);
       });
     }
 
     // Add file structure (simplified)
     if (context.files.length > 0) {
-      prompt += `PROJECT STRUCTURE:
-`;
+      parts.push(`PROJECT STRUCTURE:
+`);
       const maxFiles = 20; // Limit to avoid token limits
       context.files.slice(0, maxFiles).forEach(file => {
         if (file.isDirectory) {
-          prompt += `📁 ${file.path}/\n`;
+          parts.push(`📁 ${file.path}/\n`);
         } else {
-          prompt += `📄 ${file.path}\n`;
+          parts.push(`📄 ${file.path}\n`);
         }
       });
       
       if (context.files.length > maxFiles) {
-        prompt += `... and ${context.files.length - maxFiles} more files\n`;
+        parts.push(`... and ${context.files.length - maxFiles} more files\n`);
       }
     }
 
-    prompt += `
+    parts.push(`
 INSTRUCTIONS:
 - You are specifically helping with this project only
 - Answer questions about the code, structure, dependencies, and functionality
@@ -328,9 +454,10 @@ INSTRUCTIONS:
 - Instead use generic terms like "configured port", "localhost", "debug mode", etc.
 - Focus on code functionality and development guidance rather than deployment details
 
-`;
+`);
 
-    console.log('Built context prompt length:', prompt.length);
+    const prompt = parts.join('');
+    debugLog('Built context prompt length:', prompt.length);
     
     // If prompt is too long, provide a simplified version
     if (prompt.length > 8000) {
@@ -414,22 +541,7 @@ IMPORTANT: Do not mention specific port numbers, IP addresses, debug settings, o
    */
   private getFileLanguage(fileName: string): string {
     const ext = path.extname(fileName).toLowerCase();
-    const languageMap: Record<string, string> = {
-      '.js': 'javascript',
-      '.jsx': 'javascript',
-      '.ts': 'typescript',
-      '.tsx': 'typescript',
-      '.py': 'python',
-      '.html': 'html',
-      '.css': 'css',
-      '.json': 'json',
-      '.md': 'markdown',
-      '.yml': 'yaml',
-      '.yaml': 'yaml',
-      '.txt': 'text'
-    };
-    
-    return languageMap[ext] || 'text';
+    return LANGUAGE_BY_EXTENSION[ext] || 'text';
   }
 }
 
@@ -1,4 +1,7 @@
 import { OpenAI } from 'openai';
+import type { NodeSSH } from 'node-ssh';
+import path from 'path';
+import { Readable } from 'stream';
 
 // Dynamically import node-ssh only on server side
 const getNodeSSH = async () => {
@@ -9,6 +12,20 @@ const getNodeSSH = async () => {
   return NodeSSH;
 };
 
+// Substrings that mark a chat message as a code modification request. Phrases
+// such as 'add feature' or 'rewrite' are already matched by their single-word stems.
+const CODE_MODIFICATION_KEYWORDS = [
+  'change', 'modify', 'edit', 'update', 'add', 'remove', 'delete',
+  'create', 'make', 'fix', 'implement', 'write', 'build',
+  'improve', 'enhance', 'refactor', 'optimize'
+];
+
+// One case-insensitive pass over the message instead of one includes() per keyword
+const CODE_MODIFICATION_PATTERN = new RegExp(CODE_MODIFICATION_KEYWORDS.join('|'), 'i');
+
+// Number of file modifications written to the VM at the same time
+const MAX_CONCURRENT_WRITES = 5;
+
 interface CodeModificationRequest {
   instruction: string;
   projectPath: string;
@@ -35,19 +52,7 @@ export class OpenAIAgentService {
    * Detect if user message is requesting code modifications
    */
   static isCodeModificationRequest(message: string): boolean {
-    const codeModificationKeywords = [
-      'change', 'modify', 'edit', 'update', 'add', 'remove', 'delete',
-      'create', 'make', 'fix', 'implement', 'write', 'build',
-      'add feature', 'add function', 'add method', 'add component',
-      'change color', 'change style', 'change layout', 'change text',
-      'update code', 'modify code', 'edit file', 'rewrite',
-      'improve', 'enhance', 'refactor', 'optimize'
-    ];
-
-    const lowerMessage = message.toLowerCase();
-    return codeModificationKeywords.some(keyword => 
-      lowerMessage.includes(keyword)
-    );
+    return CODE_MODIFICATION_PATTERN.test(message);
   }
 
   /**
@@ -69,7 +74,8 @@ export class OpenAIAgentService {
       });
 
       // Get current project files
-      const filesResult = await ssh.execCommand(`find ${request.projectPath} -type f -name "*.py" -o -name "*.js" -o -name "*.jsx" -o -name "*.ts" -o -name "*.tsx" -o -name "*.html" -o -name "*.css" -o -name "*.json" | head -20`);
+      // Prune dependency and build directories so the walk never descends into them
+      const filesResult = await ssh.execCommand(`find ${request.projectPath} \\( -name node_modules -o -name .git -o -name .next -o -name dist -o -name build \\) -prune -o -type f \\( -name "*.py" -o -name "*.js" -o -name "*.jsx" -o -name "*.ts" -o -name "*.tsx" -o -name "*.html" -o -name "*.css" -o -name "*.json" \\) -print | head -20`);
       
       if (!filesResult.stdout.trim()) {
         return {
@@ -87,7 +93,8 @@ export class OpenAIAgentService {
       const fileContents: { [filePath: string]: string } = {};
       for (const filePath of projectFiles.slice(0, 10)) { // Limit to first 10 files
         try {
-          const contentResult = await ssh.execCommand(`cat ${filePath} 2>/dev/null | head -200`);
+          // Bound the read by bytes too; minified files can fit megabytes into 200 lines
+          const contentResult = await ssh.execCommand(`head -200 ${filePath} 2>/dev/null | head -c 8192`);
           if (contentResult.stdout) {
             fileContents[filePath] = contentResult.stdout;
           }
@@ -164,32 +171,27 @@ Respond ONLY with valid JSON.`;
       const filesModified: string[] = [];
       let changesDescription = modifications.analysis || 'Code modifications applied';
 
-      // Apply modifications to VM files
+      // Only the last modification of each file matters, and keeping one per path
+      // lets the batches below run without two writes racing on the same file
+      const latestByPath = new Map<string, any>();
       for (const mod of modifications.modifications || []) {
-        const { filePath, action, newContent, explanation } = mod;
+        latestByPath.delete(mod.filePath);
+        latestByPath.set(mod.filePath, mod);
+      }
+      const pendingModifications = [...latestByPath.values()];
+      // Parent directories already created during this run
+      const createdDirectories = new Set<string>();
 
-        try {
-          if (action === 'modify' || action === 'create') {
-            // Write new content to file
-            const tempFile = `/tmp/gitgenie_${Date.now()}.tmp`;
-            
-            // Create temporary file with new content
-            await ssh.execCommand(`cat > ${tempFile} << 'GITGENIE_EOF'\n${newContent}\nGITGENIE_EOF`);
-            
-            // Move to target location
-            await ssh.execCommand(`mv ${tempFile} ${filePath}`);
-            
-            filesModified.push(filePath);
-            console.log(`✅ ${action === 'create' ? 'Created' : 'Modified'} file: ${filePath}`);
-            
-          } else if (action === 'delete') {
-            await ssh.execCommand(`rm -f ${filePath}`);
-            filesModified.push(filePath);
-            console.log(`🗑️ Deleted file: ${filePath}`);
+      // Apply modifications to VM files a few at a time; each command runs on its
+      // own channel of the shared connection, so the round trips overlap
+      for (let i = 0; i < pendingModifications.length; i += MAX_CONCURRENT_WRITES) {
+        const batch = pendingModifications.slice(i, i + MAX_CONCURRENT_WRITES);
+        const applied = await Promise.all(batch.map(mod => this.applyModification(ssh, mod, createdDirectories)));
+        batch.forEach((mod, index) => {
+          if (applied[index]) {
+            filesModified.push(mod.filePath);
           }
-        } catch (error) {
-          console.error(`Failed to ${action} file ${filePath}:`, error);
-        }
+        });
       }
 
       console.log(`🎉 OpenAI Agent: Applied ${filesModified.length} file modifications`);
@@ -212,6 +214,67 @@ Respond ONLY with valid JSON.`;
       ssh.dispose();
     }
   }
+
+  /**
+   * Apply a single file modification over an existing SSH connection
+   * @param createdDirectories - Directories known to exist, shared across one run
+   * @returns Whether the file on the VM was changed
+   */
+  private async applyModification(ssh: NodeSSH, mod: any, createdDirectories: Set<string>): Promise<boolean> {
+    const { filePath, action, newContent } = mod;
+    // Each file is reported once, after the operation, with how long it took
+    const startedAt = Date.now();
+
+    try {
+      if (action === 'modify' || action === 'create') {
+        const fileContent = `${newContent}\n`;
+
+        // Stage the new content next to the target so the move is an atomic rename
+        const tempFile = `${filePath}.gitgenie-${Date.now()}.tmp`;
+        
+        // New files may live in new directories; create each parent once per run
+        // as part of the write. Concurrent creates may both run mkdir -p, which is harmless.
+        const parentDir = path.posix.dirname(filePath);
+        const needsParent = action === 'create' && !createdDirectories.has(parentDir);
+        const mkdirPrefix = needsParent ? `mkdir -p ${parentDir} && ` : '';
+        
+        // Stream the new content over stdin as raw bytes, then let cmp decide on the VM
+        // whether the target already matches. cmp stops at the first differing byte, or
+        // straight away when the sizes differ; identical content is discarded, anything
+        // else replaces the target in a single rename.
+        const writeResult = await ssh.execCommand(
+          `${mkdirPrefix}cat > ${tempFile} && ` +
+          `if cmp -s ${tempFile} ${filePath}; then rm -f ${tempFile}; echo "unchanged"; ` +
+          `else mv -f ${tempFile} ${filePath}; fi`,
+          { stdin: Readable.from([Buffer.from(fileContent, 'utf-8')]) }
+        );
+        if (writeResult.code !== 0) {
+          await ssh.execCommand(`rm -f ${tempFile}`);
+          throw new Error(writeResult.stderr || 'Failed to replace file');
+        }
+        if (needsParent) {
+          createdDirectories.add(parentDir);
+        }
+
+        if (writeResult.stdout.trim() === 'unchanged') {
+          console.log(`⏭️ Unchanged file, skipping write: ${filePath} (${Date.now() - startedAt} ms)`);
+          return false;
+        }
+        
+        console.log(`✅ ${action === 'create' ? 'Created' : 'Modified'} file: ${filePath} (${Date.now() - startedAt} ms)`);
+        return true;
+        
+      } else if (action === 'delete') {
+        await ssh.execCommand(`rm -f ${filePath}`);
+        console.log(`🗑️ Deleted file: ${filePath} (${Date.now() - startedAt} ms)`);
+        return true;
+      }
+    } catch (error) {
+      console.error(`Failed to ${action} file ${filePath}:`, error);
+    }
+
+    return false;
+  }
 }
 
 export const openaiAgentService = new OpenAIAgentService();
@@ -0,0 +1,66 @@
+import { NextRequest } from 'next/server';
+
+// How long a resolved VM IP is reused before project-status is queried again
+const VM_IP_TTL_MS = 30 * 1000;
+
+const vmIPCache = new Map<string, { vmIP: string; expiresAt: number }>();
+
+export type ProjectVmIPResult =
+     | { ok: true; vmIP: string }
+     | { ok: false; error: string; status: number };
+
+/**
+ * Forget the cached VM IP of a project, so the next proxied request checks its
+ * status again. Call this whenever a project is stopped or moved to another port.
+ * @param userId - Owner of the project
+ * @param repositoryId - Repository whose project changed
+ */
+export function clearProjectVmIP(userId: string, repositoryId: string): void {
+     vmIPCache.delete(`${userId}:${repositoryId}`);
+}
+
+/**
+ * Resolve the VM IP of a running project through the project-status endpoint.
+ * A proxied page pulls in many assets, so successful lookups are cached briefly
+ * per user and repository instead of running an SSH status check per request.
+ * @param request - Incoming proxy request, used for the base URL and cookies
+ * @param userId - Authenticated user id, part of the cache key
+ * @param repositoryId - Repository whose project is being proxied
+ * @returns The VM IP, or the error response to send back
+ */
+export async function resolveProjectVmIP(
+     request: NextRequest,
+     userId: string,
+     repositoryId: string
+): Promise<ProjectVmIPResult> {
+     const cacheKey = `${userId}:${repositoryId}`;
+     const cached = vmIPCache.get(cacheKey);
+     if (cached && cached.expiresAt > Date.now()) {
+          return { ok: true, vmIP: cached.vmIP };
+     }
+     vmIPCache.delete(cacheKey);
+
+     // Get the project status to retrieve the VM IP
+     const baseUrl = process.env.NEXTAUTH_URL || `${request.nextUrl.protocol}//${request.nextUrl.host}`;
+     const statusResponse = await fetch(`${baseUrl}/api/agent/project-status`, {
+          method: 'POST',
+          headers: {
+               'Content-Type': 'application/json',
+               'Cookie': request.headers.get('cookie') || '', // Forward cookies for auth
+          },
+          body: JSON.stringify({ repositoryId }),
+     });
+
+     if (!statusResponse.ok) {
+          return { ok: false, error: 'Failed to get project status', status: 500 };
+     }
+
+     const statusData = await statusResponse.json();
+
+     if (!statusData.isRunning || !statusData.vmIP) {
+          return { ok: false, error: 'Project is not running or VM IP not available', status: 404 };
+     }
+
+     vmIPCache.set(cacheKey, { vmIP: statusData.vmIP, expiresAt: Date.now() + VM_IP_TTL_MS });
+     return { ok: true, vmIP: statusData.vmIP };
+}